@@ -5,14 +5,22 @@ Fetches YouTube stream URLs and updates m3u8 playlists
 Enhanced with better JS challenge handling and error recovery
 """
 
+import asyncio
+import functools
+import hashlib
 import json
+import logging
 import os
+import random
 import sys
 import argparse
 import time
 import re
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from collections import deque
 from pathlib import Path
-from urllib.parse import urlencode, urlparse, parse_qs
+from urllib.parse import quote, urlencode, urlparse, parse_qs
 
 # Try to import cloudscraper first (best option)
 try:
@@ -28,6 +36,20 @@ try:
 except ImportError:
     CURL_CFFI_AVAILABLE = False
 
+# Try to import orjson (faster config parsing)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Try to import httpx (HTTP/2 multiplexing, better than plain requests)
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
 # Fallback to standard requests
 import requests
 
@@ -37,8 +59,68 @@ FOLDER_NAME = os.environ.get('FOLDER_NAME', 'streams')
 TIMEOUT = 30
 MAX_RETRIES = 3
 RETRY_DELAY = 2  # seconds
+MAX_BACKOFF = 30  # seconds, cap on jittered retry delay
+MAX_CONCURRENCY = 16  # simultaneous stream fetches
+MIN_AGE = 0  # seconds; skip streams whose file is younger than this
 VERBOSE = False
 
+# Default request headers, built once instead of per fetch
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': '*/*',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+# Sentinel returned by fetch_stream_url when the endpoint answers 304
+# and the existing file can be kept as-is
+NOT_MODIFIED = object()
+
+# Per-stream progress goes through a queue-backed logger so concurrent
+# tasks don't serialize on the stdout lock
+log = logging.getLogger('yt-streams')
+
+
+def setup_logging(verbose):
+    """Start a background listener that drains hot-path log records"""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+
+    queue = SimpleQueue()
+    listener = QueueListener(queue, handler)
+    listener.start()
+
+    log.addHandler(QueueHandler(queue))
+    log.setLevel(logging.DEBUG if verbose else logging.INFO)
+
+    return listener
+
+def _mount_pooled_adapter(session):
+    """Size the connection pool to cover MAX_CONCURRENCY fetches"""
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=64,
+        max_retries=0
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+
+def _resize_adapter_pools(session):
+    """Grow the pools of already-mounted adapters without replacing them
+
+    cloudscraper mounts its own CipherSuiteAdapter on https:// — the
+    pinned cipher suites and custom ssl_context behind its TLS
+    fingerprint bypass — so remounting a plain HTTPAdapter would undo
+    the bypass. init_poolmanager rebuilds just the pool, and
+    CipherSuiteAdapter re-injects its ssl_context there.
+    """
+    for adapter in session.adapters.values():
+        adapter.init_poolmanager(32, 64)
+
+
 def create_session():
     """Create the best available HTTP session"""
     if CLOUDSCRAPER_AVAILABLE:
@@ -77,6 +159,7 @@ def create_session():
                 max_403_retries=3
             )
             print("  → Enhanced features enabled: TLS fingerprinting, anti-detection, ML optimization")
+            _resize_adapter_pools(scraper)
             return scraper, 'cloudscraper-enhanced'
         except TypeError:
             # Fallback to basic cloudscraper if enhanced features not available
@@ -89,59 +172,105 @@ def create_session():
                 },
                 delay=10
             )
+            _resize_adapter_pools(scraper)
             return scraper, 'cloudscraper-basic'
     elif CURL_CFFI_AVAILABLE:
         print("✓ Using curl_cffi for advanced challenge bypass")
-        # curl_cffi uses a different interface
-        return None, 'curl_cffi'
+        # Session reuses pooled connections instead of a fresh
+        # TCP+TLS handshake per request
+        scraper = curl_requests.Session(impersonate="chrome120")
+        scraper.headers.update(DEFAULT_HEADERS)
+        return scraper, 'curl_cffi'
+    elif HTTPX_AVAILABLE:
+        print("⚠ Using httpx (limited challenge support)")
+        # One long-lived client gives TLS session resumption for free;
+        # with HTTP/2 all requests multiplex over a single connection
+        try:
+            client = httpx.Client(
+                http2=True,
+                headers=DEFAULT_HEADERS,
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+                follow_redirects=True
+            )
+        except ImportError:
+            # http2 extra (h2) not installed
+            client = httpx.Client(
+                headers=DEFAULT_HEADERS,
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+                follow_redirects=True
+            )
+        return client, 'httpx'
     else:
         print("⚠ Using basic requests (limited challenge support)")
         print("⚠ Install cloudscraper: pip install cloudscraper")
         print("⚠ Or install curl_cffi: pip install curl_cffi")
         session = requests.Session()
-        adapter = requests.adapters.HTTPAdapter(
-            pool_connections=10,
-            pool_maxsize=20,
-            max_retries=0
-        )
-        session.mount('http://', adapter)
-        session.mount('https://', adapter)
+        session.headers.update(DEFAULT_HEADERS)
+        _mount_pooled_adapter(session)
         return session, 'requests'
 
-# Initialize session
-session, session_type = create_session()
+@functools.lru_cache(maxsize=1)
+def get_session():
+    """Create the shared HTTP session on first use (once per process)"""
+    return create_session()
 
 
 def load_config(config_path):
     """Load configuration from JSON file"""
     try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+        # Read as bytes: orjson parses bytes natively and stdlib json
+        # accepts them too, so no up-front decode is needed
+        with open(config_path, 'rb') as f:
+            raw = f.read()
+        config = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
         print(f"✓ Loaded {len(config)} stream(s) from config")
         return config
     except FileNotFoundError:
+        # A missing or broken config only skips its own streams; the
+        # remaining config files on the command line still run
         print(f"✗ Config file not found: {config_path}")
-        sys.exit(1)
+        return []
     except json.JSONDecodeError as e:
         print(f"✗ Invalid JSON in config file: {e}")
-        sys.exit(1)
+        return []
+
+
+# Challenge-page patterns, compiled once at module load instead of per call
+# Pattern 1: location.href = "url"
+_REDIRECT_PATTERNS = [
+    re.compile(r'location\.href\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE),
+    re.compile(r'window\.location\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE),
+    re.compile(r'window\.location\.href\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE),
+    # Pattern 2: location.replace("url")
+    re.compile(r'location\.replace\s*\(\s*["\']([^"\']+)["\']\s*\)', re.IGNORECASE),
+    # Pattern 3: meta refresh
+    re.compile(r'<meta[^>]+http-equiv=["\']refresh["\'][^>]+content=["\'][^;]+;\s*url=([^"\']+)["\']', re.IGNORECASE),
+]
+
+_COOKIE_PATTERNS = [
+    re.compile(r'document\.cookie\s*=\s*["\']([^"\']+)["\']'),
+    re.compile(r'document\.cookie\s*=\s*([^;]+);'),
+]
+
+_FORM_ACTION_RE = re.compile(r'<form[^>]+action=["\']([^"\']+)["\']', re.IGNORECASE)
+
+# Raw-bytes markers so non-challenged responses can be ruled out without
+# a full text decode
+_CHALLENGE_INDICATORS = [
+    b'<script type="text/javascript" src="/aes.js"',
+    b'slowAES.decrypt',
+    b'Checking your browser',
+    b'Just a moment',
+    b'Please wait',
+    b'Verifying you are human'
+]
 
 
 def extract_redirect_url(html_content):
     """Extract redirect URL from JavaScript challenge page"""
-    # Pattern 1: location.href = "url"
-    patterns = [
-        r'location\.href\s*=\s*["\']([^"\']+)["\']',
-        r'window\.location\s*=\s*["\']([^"\']+)["\']',
-        r'window\.location\.href\s*=\s*["\']([^"\']+)["\']',
-        # Pattern 2: location.replace("url")
-        r'location\.replace\s*\(\s*["\']([^"\']+)["\']\s*\)',
-        # Pattern 3: meta refresh
-        r'<meta[^>]+http-equiv=["\']refresh["\'][^>]+content=["\'][^;]+;\s*url=([^"\']+)["\']',
-    ]
     
-    for pattern in patterns:
-        match = re.search(pattern, html_content, re.IGNORECASE)
+    for pattern in _REDIRECT_PATTERNS:
+        match = pattern.search(html_content)
         if match:
             return match.group(1)
     
@@ -151,15 +280,10 @@ def extract_redirect_url(html_content):
 def extract_challenge_cookies(html_content):
     """Extract cookies set by JavaScript challenge"""
     cookies = {}
-    
+
     # Look for document.cookie patterns
-    cookie_patterns = [
-        r'document\.cookie\s*=\s*["\']([^"\']+)["\']',
-        r'document\.cookie\s*=\s*([^;]+);',
-    ]
-    
-    for pattern in cookie_patterns:
-        matches = re.finditer(pattern, html_content)
+    for pattern in _COOKIE_PATTERNS:
+        matches = pattern.finditer(html_content)
         for match in matches:
             cookie_str = match.group(1)
             # Parse cookie string (name=value format)
@@ -173,31 +297,26 @@ def extract_challenge_cookies(html_content):
 
 def solve_js_challenge_advanced(response, slug, base_url):
     """Detect and solve JavaScript challenge with multiple strategies"""
-    content = response.text
-    
-    # Check if this is a JS challenge page
-    challenge_indicators = [
-        '<script type="text/javascript" src="/aes.js"',
-        'slowAES.decrypt',
-        'Checking your browser',
-        'Just a moment',
-        'Please wait',
-        'Verifying you are human'
-    ]
-    
-    is_challenge = any(indicator in content for indicator in challenge_indicators)
-    
+    # Check the raw bytes first: the common (non-challenged) case never
+    # pays for decoding the body to str
+    is_challenge = any(indicator in response.content for indicator in _CHALLENGE_INDICATORS)
+
     if is_challenge:
-        print(f"  ⚠ JavaScript/Anti-bot challenge detected")
-        
+        content = response.text
+        log.info("  ⚠ JavaScript/Anti-bot challenge detected")
+
+        # urlparse allocates a tuple and runs a regex; compute the origin
+        # prefix once for both the redirect and form strategies
+        parsed_base = urlparse(base_url)
+        base_prefix = f"{parsed_base.scheme}://{parsed_base.netloc}"
+
         # Strategy 1: Extract redirect URL
         redirect_url = extract_redirect_url(content)
         if redirect_url:
-            print(f"  → Strategy 1: Found redirect URL")
+            log.info("  → Strategy 1: Found redirect URL")
             # Handle relative URLs
             if redirect_url.startswith('/'):
-                parsed = urlparse(base_url)
-                redirect_url = f"{parsed.scheme}://{parsed.netloc}{redirect_url}"
+                redirect_url = f"{base_prefix}{redirect_url}"
             elif not redirect_url.startswith('http'):
                 redirect_url = f"{base_url.rstrip('/')}/{redirect_url}"
             
@@ -210,7 +329,7 @@ def solve_js_challenge_advanced(response, slug, base_url):
         # Strategy 2: Extract cookies and retry original URL
         cookies = extract_challenge_cookies(content)
         if cookies:
-            print(f"  → Strategy 2: Found {len(cookies)} challenge cookie(s)")
+            log.info(f"  → Strategy 2: Found {len(cookies)} challenge cookie(s)")
             return {
                 'type': 'cookies',
                 'url': base_url,
@@ -218,293 +337,409 @@ def solve_js_challenge_advanced(response, slug, base_url):
             }
         
         # Strategy 3: Look for hidden form submission
-        form_match = re.search(r'<form[^>]+action=["\']([^"\']+)["\']', content, re.IGNORECASE)
+        form_match = _FORM_ACTION_RE.search(content)
         if form_match:
             form_action = form_match.group(1)
             if form_action.startswith('/'):
-                parsed = urlparse(base_url)
-                form_action = f"{parsed.scheme}://{parsed.netloc}{form_action}"
-            print(f"  → Strategy 3: Found form action")
+                form_action = f"{base_prefix}{form_action}"
+            log.info("  → Strategy 3: Found form action")
             return {
                 'type': 'form',
                 'url': form_action,
                 'cookies': {}
             }
         
-        print(f"  ✗ Could not extract challenge solution")
-        if VERBOSE:
-            print(f"  → Content preview:\n{content[:500]}")
+        log.info("  ✗ Could not extract challenge solution")
+        log.debug("  → Content preview:\n%.500s", content)
     
     return None
 
 
-def make_request(url, timeout, headers, cookies=None, referer=None):
+def make_request(url, timeout, headers=None, cookies=None, referer=None):
     """Make HTTP request using the best available method"""
-    final_headers = headers.copy()
+    # Default headers live on the session; only per-request extras
+    # (If-None-Match, Referer) are passed through here
+    extra_headers = dict(headers) if headers else {}
     if referer:
-        final_headers['Referer'] = referer
+        extra_headers['Referer'] = referer
     
-    if session_type == 'curl_cffi':
-        # Use curl_cffi for tough challenges
-        response = curl_requests.get(
+    # All session types share the same get() surface and reuse pooled
+    # connections; httpx just spells its redirect kwarg differently
+    session, session_type = get_session()
+    if session_type == 'httpx':
+        return session.get(
             url,
             timeout=timeout,
-            headers=final_headers,
+            headers=extra_headers or None,
             cookies=cookies,
-            impersonate="chrome120",
-            allow_redirects=True
+            follow_redirects=True
         )
-        return response
-    else:
-        # Use cloudscraper or requests
-        response = session.get(
-            url,
-            timeout=timeout,
-            headers=final_headers,
-            cookies=cookies,
-            allow_redirects=True
-        )
-        return response
+    response = session.get(
+        url,
+        timeout=timeout,
+        headers=extra_headers or None,
+        cookies=cookies,
+        allow_redirects=True
+    )
+    return response
+
+
+# Error types where another attempt cannot change the outcome
+NON_RETRYABLE_ERRORS = {'InvalidType', 'HTTPError-403', 'HTTPError-404'}
 
 
-def fetch_stream_url_with_retry(stream_config):
+async def fetch_stream_url_with_retry(stream_config):
     """Fetch stream URL with retry logic"""
     slug = stream_config['slug']
     last_error_type = None
-    
+
     for attempt in range(1, MAX_RETRIES + 1):
         if attempt > 1:
-            delay = RETRY_DELAY * (2 ** (attempt - 2))  # Exponential backoff
-            print(f"  → Retry {attempt}/{MAX_RETRIES} after {delay}s delay...")
-            time.sleep(delay)
-        
-        result, error_type = fetch_stream_url(stream_config, attempt)
+            # Full jitter: uniform over [0, capped exponential], so
+            # streams that failed together don't retry in lockstep
+            delay = random.uniform(0, min(RETRY_DELAY * (2 ** (attempt - 1)), MAX_BACKOFF))
+            log.info(f"  → Retry {attempt}/{MAX_RETRIES} after {delay:.1f}s delay...")
+            await asyncio.sleep(delay)
+
+        result, error_type = await asyncio.to_thread(fetch_stream_url, stream_config, attempt)
         if result is not None:
             return result, None
-        
+
         last_error_type = error_type
+        if error_type in NON_RETRYABLE_ERRORS:
+            log.info(f"  ✗ {error_type} for {slug} is not retryable, giving up")
+            return None, error_type
         if attempt < MAX_RETRIES:
-            print(f"  → Attempt {attempt} failed, will retry...")
-    
-    print(f"  ✗ All {MAX_RETRIES} attempts failed for {slug}")
+            log.info(f"  → Attempt {attempt} failed, will retry...")
+
+    log.info(f"  ✗ All {MAX_RETRIES} attempts failed for {slug}")
     return None, last_error_type
 
 
+# Stream type -> yt.php query parameter; unknown types get no URL
+_TYPE_PARAM = {
+    'video': 'v',
+    'channel': 'c',
+}
+
+
+def build_stream_url(stream_config):
+    """Build the endpoint URL for a stream, or None for unknown types"""
+    query_param = _TYPE_PARAM.get(stream_config.get('type', 'channel'))
+    if query_param is None:
+        return None
+
+    # IDs come from user-edited configs; quote keeps a stray '&' or
+    # space from corrupting the query string
+    return f"{ENDPOINT}/yt.php?{query_param}={quote(stream_config['id'], safe='')}"
+
+
 def fetch_stream_url(stream_config, attempt_num=1):
     """Fetch the YouTube stream m3u8 URL"""
-    stream_type = stream_config.get('type', 'channel')
-    stream_id = stream_config['id']
     slug = stream_config['slug']
-    
-    # Build query string based on type
-    if stream_type == 'video':
-        query_param = 'v'
-    elif stream_type == 'channel':
-        query_param = 'c'
-    else:
-        print(f"✗ Unknown type '{stream_type}' for {slug}")
+
+    # URL is precomputed once at config load; rebuild only when called
+    # outside main_async (e.g. as a library)
+    url = stream_config.get('_url') or build_stream_url(stream_config)
+    if url is None:
+        log.info(f"✗ Unknown type '{stream_config.get('type', 'channel')}' for {slug}")
         return None, 'InvalidType'
-    
-    # Build request URL
-    url = f"{ENDPOINT}/yt.php?{query_param}={stream_id}"
-    
-    print(f"  Fetching: {url}")
+
+    log.info(f"  Fetching: {url}")
     
     try:
-        # Prepare headers
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': '*/*',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        }
-        
-        print(f"  → Sending GET request (timeout={TIMEOUT}s, attempt={attempt_num})...")
+        headers = None
+
+        # Conditional GET: if we still have last run's file and its ETag
+        # sidecar, let the endpoint answer 304 and skip the body entirely
+        output_file = get_output_path(stream_config)
+        etag_file = output_file.with_suffix('.etag')
+        try:
+            etag = etag_file.read_text().strip()
+        except OSError:
+            etag = None
+        if etag and output_file.exists():
+            headers = {'If-None-Match': etag}
+
+        log.info(f"  → Sending GET request (timeout={TIMEOUT}s, attempt={attempt_num})...")
         
         # Make initial request
         response = make_request(url, TIMEOUT, headers)
         
         # Log response details
-        print(f"  → Status Code: {response.status_code}")
-        print(f"  → Content Type: {response.headers.get('Content-Type', 'N/A')}")
-        print(f"  → Content Length: {len(response.content)} bytes")
+        log.info(f"  → Status Code: {response.status_code}")
+        log.info(f"  → Content Type: {response.headers.get('Content-Type', 'N/A')}")
+        log.info(f"  → Content Length: {len(response.content)} bytes")
         
         # Log redirect chain if any
         if hasattr(response, 'history') and response.history:
-            print(f"  → Redirects: {len(response.history)} redirect(s)")
+            log.info(f"  → Redirects: {len(response.history)} redirect(s)")
             for i, hist_resp in enumerate(response.history, 1):
-                print(f"    {i}. {hist_resp.status_code} → {hist_resp.url}")
-            print(f"  → Final URL: {response.url}")
-        
+                log.info(f"    {i}. {hist_resp.status_code} → {hist_resp.url}")
+            log.info(f"  → Final URL: {response.url}")
+
+        if response.status_code == 304:
+            log.info("  ✓ Not modified (ETag match), keeping existing file")
+            return NOT_MODIFIED, None
+
         response.raise_for_status()
-        
-        # Check if we got a challenge page
-        challenge_solution = solve_js_challenge_advanced(response, slug, url)
-        
+
+        # Short-circuit: a body whose head already carries #EXTM3U is a
+        # playlist, not a challenge page — skip the marker scans
+        if response.content.find(b'#EXTM3U', 0, 8192) != -1:
+            challenge_solution = None
+        else:
+            # Check if we got a challenge page
+            challenge_solution = solve_js_challenge_advanced(response, slug, url)
+
         if challenge_solution:
             solution_type = challenge_solution['type']
             target_url = challenge_solution['url']
             challenge_cookies = challenge_solution['cookies']
             
-            print(f"  → Attempting to solve challenge (type: {solution_type})...")
+            log.info(f"  → Attempting to solve challenge (type: {solution_type})...")
             
-            # Wait a bit before following (simulate human behavior)
-            time.sleep(2)
+            # Wait a bit before following (simulate human behavior);
+            # jittered so concurrent challenged streams don't move in step
+            time.sleep(random.uniform(1, 3))
             
             # Merge any cookies from the challenge
             request_cookies = dict(response.cookies)
             if challenge_cookies:
                 request_cookies.update(challenge_cookies)
             
-            # Make follow-up request
-            print(f"  → Following challenge solution to: {target_url}")
+            # Make follow-up request. Don't forward the If-None-Match
+            # headers: a 304 here would have an empty body and be
+            # misread as invalid content, failing a stream whose
+            # manifest is actually fine
+            log.info(f"  → Following challenge solution to: {target_url}")
             response2 = make_request(
                 target_url,
                 TIMEOUT,
-                headers,
                 cookies=request_cookies if request_cookies else None,
                 referer=url
             )
             
-            print(f"  → Second request status: {response2.status_code}")
-            print(f"  → Content Length: {len(response2.content)} bytes")
-            print(f"  → Content Type: {response2.headers.get('Content-Type', 'N/A')}")
+            log.info(f"  → Second request status: {response2.status_code}")
+            log.info(f"  → Content Length: {len(response2.content)} bytes")
+            log.info(f"  → Content Type: {response2.headers.get('Content-Type', 'N/A')}")
             
             response2.raise_for_status()
             
             # Check if we still have a challenge
             second_challenge = solve_js_challenge_advanced(response2, slug, target_url)
             if second_challenge:
-                print(f"  ✗ Still facing challenge after solution attempt")
+                log.info("  ✗ Still facing challenge after solution attempt")
                 return None, 'ChallengeFailed'
             
             response = response2  # Use the second response
         
-        # Check if content looks like m3u8
-        content_preview = response.text[:200] if len(response.text) > 200 else response.text
-        
-        if '#EXTM3U' in content_preview:
-            print(f"  ✓ Valid m3u8 content detected")
+        # Sniff the raw bytes: only decode the body to str once we know
+        # it is worth keeping (HTML error bodies never get decoded)
+        head = response.content[:256]
+
+        if b'#EXTM3U' in head:
+            log.info("  ✓ Valid m3u8 content detected")
+            # Remember the ETag so save_stream can write the sidecar for
+            # next run's conditional GET
+            stream_config['_etag'] = response.headers.get('ETag')
             return response.text, None
-        elif '<html' in content_preview.lower() or '<!doctype' in content_preview.lower():
-            print(f"  ✗ Error: Received HTML instead of m3u8")
-            if VERBOSE:
-                print(f"  → Content preview: {content_preview[:300]}...")
+        elif b'<html' in head.lower() or b'<!doctype' in head.lower():
+            log.info("  ✗ Error: Received HTML instead of m3u8")
+            log.debug("  → Content preview: %s...", head)
             
             # Check if it's still a challenge page
-            if any(indicator in response.text for indicator in ['Checking your browser', 'Just a moment', 'cloudflare']):
+            if any(indicator in response.content for indicator in (b'Checking your browser', b'Just a moment', b'cloudflare')):
                 return None, 'ChallengeNotSolved'
             
             return None, 'HTMLResponse'
         else:
-            print(f"  ⚠ Warning: Content doesn't start with #EXTM3U")
-            if VERBOSE:
-                print(f"  → Content preview: {content_preview[:150]}...")
+            log.info("  ⚠ Warning: Content doesn't start with #EXTM3U")
+            log.debug("  → Content preview: %.150s...", head)
             
             # If content looks like it might be m3u8 without the header, try to use it
-            if '.m3u8' in content_preview or 'EXT-X-' in content_preview:
-                print(f"  ⚠ Content might be valid m3u8 despite missing header")
+            if b'.m3u8' in head or b'EXT-X-' in head:
+                log.info("  ⚠ Content might be valid m3u8 despite missing header")
+                stream_config['_etag'] = response.headers.get('ETag')
                 return response.text, None
             
             return None, 'InvalidContent'
         
     except requests.exceptions.Timeout:
         error_type = 'Timeout'
-        print(f"  ✗ Timeout error for {slug}: Request exceeded {TIMEOUT}s")
+        log.info(f"  ✗ Timeout error for {slug}: Request exceeded {TIMEOUT}s")
         return None, error_type
     except requests.exceptions.ConnectionError as e:
         error_type = 'ConnectionError'
-        print(f"  ✗ Connection error for {slug}")
-        if VERBOSE:
-            print(f"  → Error details: {e}")
+        log.info(f"  ✗ Connection error for {slug}")
+        log.debug("  → Error details: %s", e)
         return None, error_type
     except requests.exceptions.HTTPError as e:
         error_type = f'HTTPError-{e.response.status_code}'
-        print(f"  ✗ HTTP error for {slug}: {e.response.status_code}")
-        if VERBOSE:
-            print(f"  → Response: {e.response.text[:200] if e.response.text else 'No content'}")
+        log.info(f"  ✗ HTTP error for {slug}: {e.response.status_code}")
+        log.debug("  → Response: %.200s", e.response.text or 'No content')
         return None, error_type
     except Exception as e:
+        # The curl_cffi and httpx backends raise their own hierarchies;
+        # map them onto the same error types as requests so retry rules
+        # — including the non-retryable 403/404 set — behave
+        # identically. Timeouts are checked first within each family
+        if CURL_CFFI_AVAILABLE and isinstance(e, curl_requests.exceptions.Timeout):
+            log.info(f"  ✗ Timeout error for {slug}: Request exceeded {TIMEOUT}s")
+            return None, 'Timeout'
+        if CURL_CFFI_AVAILABLE and isinstance(e, curl_requests.exceptions.HTTPError):
+            # Older curl_cffi releases don't attach the response; the
+            # status code is still in the message
+            code = getattr(getattr(e, 'response', None), 'status_code', None)
+            if code is None:
+                match = re.search(r'\b([45]\d\d)\b', str(e))
+                code = int(match.group(1)) if match else 'unknown'
+            log.info(f"  ✗ HTTP error for {slug}: {code}")
+            log.debug("  → Error details: %s", e)
+            return None, f'HTTPError-{code}'
+        if CURL_CFFI_AVAILABLE and isinstance(e, curl_requests.exceptions.ConnectionError):
+            log.info(f"  ✗ Connection error for {slug}")
+            log.debug("  → Error details: %s", e)
+            return None, 'ConnectionError'
+        if HTTPX_AVAILABLE and isinstance(e, httpx.TimeoutException):
+            log.info(f"  ✗ Timeout error for {slug}: Request exceeded {TIMEOUT}s")
+            return None, 'Timeout'
+        if HTTPX_AVAILABLE and isinstance(e, httpx.HTTPStatusError):
+            error_type = f'HTTPError-{e.response.status_code}'
+            log.info(f"  ✗ HTTP error for {slug}: {e.response.status_code}")
+            log.debug("  → Response: %.200s", e.response.text or 'No content')
+            return None, error_type
+        if HTTPX_AVAILABLE and isinstance(e, httpx.TransportError):
+            log.info(f"  ✗ Connection error for {slug}")
+            log.debug("  → Error details: %s", e)
+            return None, 'ConnectionError'
         error_type = type(e).__name__
-        print(f"  ✗ Request error for {slug}: {type(e).__name__}")
-        print(f"  → Error details: {e}")
-        if VERBOSE:
+        log.info(f"  ✗ Request error for {slug}: {type(e).__name__}")
+        log.info(f"  → Error details: {e}")
+        if log.isEnabledFor(logging.DEBUG):
             import traceback
-            print(f"  → Traceback: {traceback.format_exc()}")
+            log.debug("  → Traceback: %s", traceback.format_exc())
         return None, error_type
 
 
-def reverse_hls_quality(m3u8_content):
+def stream_reverse_to_file(m3u8_content, output_file):
     """
-    Reverse the quality order in m3u8 playlist
+    Write the playlist to output_file with quality order reversed
     High quality streams will appear first
+
+    Accepts the playlist as text or raw bytes. Completed blocks are
+    collected with deque.appendleft, so the reversal is free and no
+    intermediate reversed copy of the playlist is ever built.
     """
-    lines = m3u8_content.split('\n')
-    
-    # Find all stream definitions (lines starting with #EXT-X-STREAM-INF)
-    stream_blocks = []
-    current_block = []
-    
-    for line in lines:
-        if line.startswith('#EXTM3U'):
-            # Keep header
-            continue
-        elif line.startswith('#EXT-X-STREAM-INF'):
-            if current_block:
-                stream_blocks.append(current_block)
-            current_block = [line]
-        elif current_block:
-            current_block.append(line)
-            if line and not line.startswith('#'):
-                # End of this stream block
-                stream_blocks.append(current_block)
-                current_block = []
-    
-    # Add any remaining block
-    if current_block:
-        stream_blocks.append(current_block)
-    
-    # Reverse the order (high quality first)
-    stream_blocks.reverse()
-    
-    # Reconstruct m3u8
-    result = ['#EXTM3U']
-    for block in stream_blocks:
-        result.extend(block)
-    
-    return '\n'.join(result)
+    if isinstance(m3u8_content, str):
+        body = m3u8_content.encode('utf-8')
+    else:
+        body = m3u8_content
 
+    # Locate the variant blocks with bytes.find — C-level memmem scans
+    # instead of iterating every line in Python. Blocks are stored as
+    # (start, end) byte offsets, prepended so the order comes out
+    # reversed for free
+    stream_blocks = deque()
+    prepend_block = stream_blocks.appendleft
+    find = body.find
 
-def get_output_path(stream_config):
-    """Get the output file path for a stream"""
-    slug = stream_config['slug']
-    subfolder = stream_config.get('subfolder', '')
-    
-    # Build output path
+    pos = find(b'#EXT-X-STREAM-INF')
+    while pos >= 0:
+        nxt = find(b'#EXT-X-STREAM-INF', pos + 1)
+        limit = nxt if nxt >= 0 else len(body)
+
+        # The block runs through its URI line: the first line after the
+        # tag that is non-empty and doesn't start with '#'
+        end = limit
+        line_start = find(b'\n', pos) + 1
+        while 0 < line_start < limit:
+            eol = find(b'\n', line_start)
+            if eol < 0 or eol >= limit:
+                break
+            first = body[line_start:line_start + 1]
+            if first not in (b'#', b'\r', b'\n'):
+                end = eol + 1
+                break
+            line_start = eol + 1
+        prepend_block((pos, end))
+
+        pos = nxt
+
+    # Blocks are already in reversed (high quality first) order. Gather
+    # the slices as memoryviews (copy-free) and join them into a single
+    # write instead of one per block; unlike os.writev this is portable
+    # to Windows, has no IOV_MAX limit, and can't write short
+    view = memoryview(body)
+    buffers = [b'#EXTM3U\n']
+    for s, e in stream_blocks:
+        buffers.append(view[s:e])
+        if body[e - 1:e] != b'\n':
+            buffers.append(b'\n')
+
+    with open(output_file, 'wb') as f:
+        f.write(b''.join(buffers))
+
+
+@functools.lru_cache(maxsize=None)
+def _build_output_path(folder, subfolder, slug):
+    """Build (and cache) the output Path for a stream"""
     if subfolder:
-        output_dir = Path(FOLDER_NAME) / subfolder
+        output_dir = Path(folder) / subfolder
     else:
-        output_dir = Path(FOLDER_NAME)
-    
+        output_dir = Path(folder)
+
     return output_dir / f"{slug}.m3u8"
 
 
+def get_output_path(stream_config):
+    """Get the output file path for a stream"""
+    # Called up to three times per stream (save + delete paths); memoized
+    # so the Path is only constructed once
+    return _build_output_path(
+        FOLDER_NAME,
+        stream_config.get('subfolder', ''),
+        stream_config['slug']
+    )
+
+
+def same_file_content(new_file, old_file):
+    """True when both files exist with identical size and digest"""
+    try:
+        if new_file.stat().st_size != old_file.stat().st_size:
+            return False
+        new_digest = hashlib.blake2b(new_file.read_bytes(), digest_size=16).digest()
+        old_digest = hashlib.blake2b(old_file.read_bytes(), digest_size=16).digest()
+        return new_digest == old_digest
+    except OSError:
+        return False
+
+
+# Directories already ensured on disk this run
+_created_dirs = set()
+
+
+def ensure_output_dir(output_dir):
+    """Create an output directory once per run (cached in a set)"""
+    if output_dir not in _created_dirs:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        _created_dirs.add(output_dir)
+
+
 def delete_old_file(stream_config):
     """Delete the old m3u8 file if it exists"""
     output_file = get_output_path(stream_config)
     
     try:
-        if output_file.exists():
-            output_file.unlink()
-            print(f"  ⚠ Deleted old file: {output_file}")
-            return True
+        # EAFP: one unlink syscall instead of stat + unlink
+        output_file.unlink()
+        log.info(f"  ⚠ Deleted old file: {output_file}")
+        return True
+    except FileNotFoundError:
+        return False
     except Exception as e:
-        print(f"  ⚠ Could not delete old file {output_file}: {e}")
+        log.info(f"  ⚠ Could not delete old file {output_file}: {e}")
         return False
-    
-    return False
 
 
 def save_stream(stream_config, m3u8_content):
@@ -513,22 +748,41 @@ def save_stream(stream_config, m3u8_content):
     
     # Get output file path
     output_file = get_output_path(stream_config)
-    output_dir = output_file.parent
-    
-    # Create directory if it doesn't exist
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Reverse quality order
-    reversed_content = reverse_hls_quality(m3u8_content)
-    
-    # Write to file
+    ensure_output_dir(output_file.parent)
+
+    # Write to a temp file in the same directory and os.replace it into
+    # place, so a killed run never leaves a truncated playlist behind
+    tmp_file = output_file.with_suffix('.m3u8.tmp')
+
+    # Reverse quality order and write to disk in one fused pass
     try:
-        with open(output_file, 'w') as f:
-            f.write(reversed_content)
-        print(f"  ✓ Saved: {output_file}")
+        if m3u8_content.count('#EXT-X-STREAM-INF') <= 1:
+            # Media playlist (no variants) or a single-variant master:
+            # nothing to reverse either way — encode once and issue a
+            # single binary write. Text mode would rewrite \n to \r\n on
+            # Windows, and HLS is strictly UTF-8 with bare \n (RFC 8216)
+            with open(tmp_file, 'wb') as f:
+                f.write(m3u8_content.encode('utf-8', 'surrogatepass'))
+        else:
+            stream_reverse_to_file(m3u8_content, tmp_file)
+        if same_file_content(tmp_file, output_file):
+            # Byte-identical to what's already published: drop the temp
+            # file and leave mtime alone so downstream caches stay warm
+            tmp_file.unlink()
+            log.info(f"  ✓ Unchanged: {output_file}")
+        else:
+            os.replace(tmp_file, output_file)
+            log.info(f"  ✓ Saved: {output_file}")
+
+        # Persist the ETag sidecar so the next run can send If-None-Match
+        etag = stream_config.get('_etag')
+        if etag:
+            output_file.with_suffix('.etag').write_text(etag)
+
         return True
     except Exception as e:
-        print(f"  ✗ Error saving {output_file}: {e}")
+        log.info(f"  ✗ Error saving {output_file}: {e}")
+        tmp_file.unlink(missing_ok=True)
         return False
 
 
@@ -585,6 +839,14 @@ Examples:
         help=f'Initial retry delay in seconds (default: {RETRY_DELAY})'
     )
     
+    parser.add_argument(
+        '--min-age',
+        type=int,
+        default=MIN_AGE,
+        help='Skip streams whose output file is younger than this many '
+             f'seconds; per-stream "ttl" keys override it (default: {MIN_AGE})'
+    )
+    
     parser.add_argument(
         '-v', '--verbose',
         action='store_true',
@@ -600,70 +862,142 @@ Examples:
     return parser.parse_args()
 
 
-def main():
-    """Main execution function"""
-    global VERBOSE
-    args = parse_arguments()
-    
-    # Update globals with command line arguments
-    global ENDPOINT, FOLDER_NAME, TIMEOUT, MAX_RETRIES, RETRY_DELAY
-    ENDPOINT = args.endpoint
-    FOLDER_NAME = args.folder
-    TIMEOUT = args.timeout
-    MAX_RETRIES = args.retries
-    RETRY_DELAY = args.retry_delay
-    VERBOSE = args.verbose
-    
-    print("=" * 50)
-    print("YouTube Stream Updater (Improved)")
-    print("=" * 50)
-    print(f"Endpoint: {ENDPOINT}")
-    print(f"Output folder: {FOLDER_NAME}")
-    print(f"Config files: {', '.join(args.config_files)}")
-    print(f"Timeout: {TIMEOUT}s")
-    print(f"Max retries: {MAX_RETRIES}")
-    print(f"Retry delay: {RETRY_DELAY}s")
-    print(f"Verbose: {VERBOSE}")
-    print(f"Session type: {session_type}")
-    print("=" * 50)
-    
+async def fetch_stream_bounded(semaphore, stream):
+    """Run the blocking fetch in a worker thread, bounded by the semaphore"""
+    async with semaphore:
+        # Each attempt runs the sync session stack in a worker thread;
+        # backoff sleeps happen on the event loop, not in the thread
+        return await fetch_stream_url_with_retry(stream)
+
+
+async def process_stream(semaphore, fetch_cache, stream, index, total):
+    """Fetch and save a single stream, bounded by the shared semaphore"""
+    slug = stream.get('slug', 'unknown')
+
+    log.info(f"\n[{index}/{total}] Processing: {slug}")
+
+    # Fast path: a file refreshed within its TTL costs zero network I/O.
+    # Per-stream "ttl" overrides the global --min-age
+    ttl = stream.get('ttl', MIN_AGE)
+    if ttl:
+        output_file = get_output_path(stream)
+        try:
+            age = time.time() - output_file.stat().st_mtime
+        except OSError:
+            age = None
+        if age is not None and age < ttl:
+            log.info(f"  ✓ Still fresh ({age:.0f}s old, ttl {ttl}s), skipping fetch")
+            return True, None
+
+    # Mirrored configs often repeat the same stream — share one fetch
+    # task per unique request URL for the whole run. The dispatching
+    # stream's dict is kept alongside the task: that's where the fetch
+    # records the response ETag, and duplicates need it for their own
+    # sidecars
+    key = stream.get('_url')
+    entry = fetch_cache.get(key)
+    if entry is None:
+        fetch_task = asyncio.create_task(fetch_stream_bounded(semaphore, stream))
+        fetch_cache[key] = (fetch_task, stream)
+        owner = stream
+    else:
+        fetch_task, owner = entry
+        log.info(f"  → Sharing fetch already dispatched for {slug}")
+
+    m3u8_content, error_type = await fetch_task
+
+    if owner is not stream and '_etag' in owner:
+        stream['_etag'] = owner['_etag']
+
+    if m3u8_content is NOT_MODIFIED:
+        # Endpoint confirmed the manifest is unchanged; keep the file.
+        # The If-None-Match came from whichever stream dispatched the
+        # shared fetch, so a duplicate with no copy of its own on disk
+        # still needs a real body — refetch just this stream (with no
+        # local file, no conditional header is sent)
+        if get_output_path(stream).exists():
+            return True, None
+        log.info(f"  → Shared fetch got 304 but no local file for {slug}, fetching directly")
+        m3u8_content, error_type = await fetch_stream_bounded(semaphore, stream)
+        if m3u8_content is NOT_MODIFIED:
+            return False, 'NotModified'
+
+    if m3u8_content:
+        # Save to file (blocking disk I/O off the event loop); a failed
+        # save leaves the previous playlist untouched thanks to the
+        # atomic replace, so no cleanup is needed here
+        if await asyncio.to_thread(save_stream, stream, m3u8_content):
+            return True, None
+        return False, 'SaveError'
+    else:
+        # Delete old file on fetch error
+        await asyncio.to_thread(delete_old_file, stream)
+        return False, error_type
+
+
+async def main_async(args):
+    """Process all config files, fetching streams concurrently"""
     total_success = 0
     total_fail = 0
     error_summary = {}  # Track error types
-    
-    # Process each config file
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    fetch_cache = {}  # request URL -> (shared fetch task, dispatching stream)
+
+    # Load every config up front (cheap local I/O), then dispatch the
+    # streams from all of them into a single gather so fetches from
+    # different config files overlap instead of running file-by-file
+    tasks = []
     for config_file in args.config_files:
         print(f"\n📄 Processing config: {config_file}")
         print("-" * 50)
-        
+
         # Load configuration
         streams = load_config(config_file)
-        
-        # Process each stream
-        for i, stream in enumerate(streams, 1):
-            slug = stream.get('slug', 'unknown')
-            print(f"\n[{i}/{len(streams)}] Processing: {slug}")
-            
-            # Fetch stream URL with retry
-            m3u8_content, error_type = fetch_stream_url_with_retry(stream)
-            
-            if m3u8_content:
-                # Save to file
-                if save_stream(stream, m3u8_content):
-                    total_success += 1
-                else:
-                    total_fail += 1
-                    # Delete old file on save error
-                    delete_old_file(stream)
-                    error_summary['SaveError'] = error_summary.get('SaveError', 0) + 1
-            else:
+
+        # Precompute each request URL and output directory once instead
+        # of per attempt (ensure_output_dir's cache keeps the mkdirs to
+        # one per unique subfolder). A malformed entry — missing 'id'
+        # or 'slug' — is counted as a failure here instead of crashing
+        # the run before any task is dispatched
+        prepared = []
+        for stream in streams:
+            try:
+                stream['_url'] = build_stream_url(stream)
+                ensure_output_dir(get_output_path(stream).parent)
+            except KeyError as e:
+                print(f"✗ Skipping malformed config entry (missing {e}): {stream}")
                 total_fail += 1
-                # Delete old file on fetch error
-                delete_old_file(stream)
-                # Track error type
-                if error_type:
-                    error_summary[error_type] = error_summary.get(error_type, 0) + 1
-    
+                error_summary['ConfigError'] = error_summary.get('ConfigError', 0) + 1
+                continue
+            prepared.append(stream)
+        streams = prepared
+
+        # Concurrency is bounded by the shared semaphore, not per config
+        tasks.extend(
+            asyncio.create_task(process_stream(semaphore, fetch_cache, stream, i, len(streams)))
+            for i, stream in enumerate(streams, 1)
+        )
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    for result in results:
+        if isinstance(result, BaseException):
+            # A crashed task (e.g. malformed config entry) counts as
+            # a failure instead of aborting the whole run
+            log.info(f"  ✗ Unexpected error: {result!r}")
+            total_fail += 1
+            error_name = type(result).__name__
+            error_summary[error_name] = error_summary.get(error_name, 0) + 1
+            continue
+        success, error_type = result
+        if success:
+            total_success += 1
+        else:
+            total_fail += 1
+            if error_type:
+                error_summary[error_type] = error_summary.get(error_type, 0) + 1
+
     # Summary
     print("\n" + "=" * 50)
     print(f"Complete: {total_success} successful, {total_fail} failed")
@@ -687,5 +1021,42 @@ def main():
             print("💡 Use --fail-on-error to exit with error code on failures")
 
 
+def main():
+    """Main execution function"""
+    global VERBOSE
+    args = parse_arguments()
+
+    # Update globals with command line arguments
+    global ENDPOINT, FOLDER_NAME, TIMEOUT, MAX_RETRIES, RETRY_DELAY, MIN_AGE
+    ENDPOINT = args.endpoint
+    FOLDER_NAME = args.folder
+    TIMEOUT = args.timeout
+    MAX_RETRIES = args.retries
+    RETRY_DELAY = args.retry_delay
+    MIN_AGE = args.min_age
+    VERBOSE = args.verbose
+
+    print("=" * 50)
+    print("YouTube Stream Updater (Improved)")
+    print("=" * 50)
+    print(f"Endpoint: {ENDPOINT}")
+    print(f"Output folder: {FOLDER_NAME}")
+    print(f"Config files: {', '.join(args.config_files)}")
+    print(f"Timeout: {TIMEOUT}s")
+    print(f"Max retries: {MAX_RETRIES}")
+    print(f"Retry delay: {RETRY_DELAY}s")
+    print(f"Min age: {MIN_AGE}s")
+    print(f"Verbose: {VERBOSE}")
+    print(f"Max concurrency: {MAX_CONCURRENCY}")
+    print(f"Session type: {get_session()[1]}")
+    print("=" * 50)
+
+    listener = setup_logging(VERBOSE)
+    try:
+        asyncio.run(main_async(args))
+    finally:
+        listener.stop()
+
+
 if __name__ == "__main__":
     main()